@@ -1,15 +1,43 @@
 import os
+import copy
+import functools
 import yaml
 from dotenv import load_dotenv
 
-load_dotenv()
+# Prefer libyaml's C parser when PyYAML was built against it
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+# Production deployments inject real environment variables; skip the .env read
+if os.getenv('ENV') != 'production':
+    load_dotenv()
+
+@functools.lru_cache(maxsize=4)
+def _load_yaml(path, mtime):
+    """Parse a YAML file; keyed on mtime so edits are picked up"""
+    with open(path, 'r') as file:
+        return yaml.load(file, Loader=_Loader)
 
 class Config:
+    _instance = None
+    
+    def __new__(cls):
+        # One shared instance; environment and YAML are read only once
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+    
     def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        
         # Load configuration from YAML file
         config_path = os.path.join(os.path.dirname(__file__), '..', 'config.yaml')
-        with open(config_path, 'r') as file:
-            self.config = yaml.safe_load(file)
+        self.config = copy.deepcopy(_load_yaml(config_path, os.path.getmtime(config_path)))
         
         # Environment variables
         self.OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
@@ -18,15 +46,20 @@ class Config:
         # Database settings
         self.DATABASE_NAME = self.config['database']['database_name']
         self.COLLECTION_NAME = self.config['database']['collection_name']
+        self.DB_POOL = self.config['database']['pool']
+        self.DB_UNACKNOWLEDGED_WRITES = self.config['database']['unacknowledged_writes']
         
         # Model settings
         self.SENTIMENT_MODEL = self.config['models']['sentiment_model']
+        self.SENTIMENT_ONNX = self.config['models']['sentiment_onnx']
         self.SIMILARITY_MODEL = self.config['models']['similarity_model']
+        self.NLP_DISK_CACHE = self.config['models']['disk_cache']
         
         # OpenAI settings
         self.OPENAI_MODEL = self.config['openai']['model']
         self.MAX_TOKENS = self.config['openai']['max_tokens']
         self.TEMPERATURE = self.config['openai']['temperature']
+        self.OPENAI_JSON_MODE = self.config['openai']['json_mode']
         
         # Scraping settings
         self.TIMEOUT = self.config['scraping']['timeout']
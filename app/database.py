@@ -1,61 +1,176 @@
 from pymongo import MongoClient
+from pymongo.write_concern import WriteConcern
 from datetime import datetime
 from config import config
+import atexit
+import functools
 import logging
+import threading
+
+@functools.lru_cache(maxsize=None)
+def get_client(uri, **pool_options):
+    """Return the process-wide MongoClient (and its connection pool) for a URI"""
+    return MongoClient(uri, **pool_options)
 
 class DatabaseManager:
+    FLUSH_THRESHOLD = 50
+    FLUSH_INTERVAL = 0.5  # seconds
+
     def __init__(self):
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._flush_timer = None
+        self._flush_lock = threading.Lock()
+        atexit.register(self.flush)
         try:
-            self.client = MongoClient(config.MONGODB_URI)
+            pool = config.DB_POOL
+            self.client = get_client(
+                config.MONGODB_URI,
+                maxPoolSize=pool['max_pool_size'],
+                minPoolSize=pool['min_pool_size'],
+                maxIdleTimeMS=pool['max_idle_time_ms'],
+                waitQueueTimeoutMS=pool['wait_queue_timeout_ms'],
+                serverSelectionTimeoutMS=pool['server_selection_timeout_ms'],
+                retryWrites=pool['retry_writes']
+            )
             self.db = self.client[config.DATABASE_NAME]
             self.collection = self.db[config.COLLECTION_NAME]
+            # Fire-and-forget handle: returns once the write hits the socket
+            self.collection_fast = self.db.get_collection(
+                config.COLLECTION_NAME, write_concern=WriteConcern(w=0)
+            )
             logging.info("Connected to MongoDB successfully")
         except Exception as e:
             logging.error(f"Failed to connect to MongoDB: {e}")
             self.client = None
             self.db = None
             self.collection = None
-    
-    def save_analysis(self, url, content, analysis_result):
-        """Save analysis results to MongoDB"""
-        if self.collection is None:
-            return False
+            self.collection_fast = None
+            return
         
-        document = {
+        # Index builds wait on server selection; keep them off the import path
+        threading.Thread(target=self._ensure_indexes, name="mongo-indexes", daemon=True).start()
+    
+    def _ensure_indexes(self):
+        """Create indexes backing search_by_url and get_recent_analyses"""
+        try:
+            self.collection.create_index([("url", 1)])
+            self.collection.create_index([("timestamp", -1)])
+        except Exception as e:
+            logging.warning(f"Failed to create MongoDB indexes: {e}")
+    
+    def _build_document(self, url, content, analysis_result):
+        now = datetime.now()
+        return {
             "url": url,
             "content": content[:500],  # Store first 500 chars
             "analysis": analysis_result,
-            "timestamp": datetime.now(),
-            "created_at": datetime.now()
+            "timestamp": now,
+            "created_at": now
         }
+    
+    def save_analysis(self, url, content, analysis_result, buffered=False, fast=False):
+        """Save analysis results to MongoDB
+        
+        With buffered=True the document is queued and written together with
+        others via insert_many once FLUSH_THRESHOLD documents have accumulated,
+        or by a timer FLUSH_INTERVAL seconds after the first one was queued.
+        Reads and interpreter exit flush the queue first. With fast=True
+        (or database.unacknowledged_writes set) the insert is not acknowledged,
+        buffered or not.
+        """
+        if self.collection is None:
+            return False
+        
+        document = self._build_document(url, content, analysis_result)
+        
+        if buffered:
+            return self.flush() if self._buffer_document(document, fast) else True
         
         try:
-            result = self.collection.insert_one(document)
+            result = self._write_collection(fast).insert_one(document)
             logging.info(f"Analysis saved with ID: {result.inserted_id}")
             return True
         except Exception as e:
             logging.error(f"Failed to save analysis: {e}")
             return False
     
-    def get_recent_analyses(self, limit=10):
-        """Get recent analysis results"""
+    def _write_collection(self, fast):
+        """The unacknowledged (w=0) handle when requested or configured, else the normal one"""
+        if fast or config.DB_UNACKNOWLEDGED_WRITES:
+            return self.collection_fast
+        return self.collection
+    
+    def _buffer_document(self, document, fast=False):
+        """Queue a document for the next flush; returns True once the buffer is full"""
+        with self._pending_lock:
+            self._pending.append((document, fast))
+            due = len(self._pending) >= self.FLUSH_THRESHOLD
+            if not due and self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.FLUSH_INTERVAL, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+        return due
+    
+    def flush(self):
+        """Write any buffered analyses in a single batch"""
+        # Held across the insert so reads and exit wait for an in-flight timed flush
+        with self._flush_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, []
+                timer, self._flush_timer = self._flush_timer, None
+            if timer is not None:
+                timer.cancel()
+            
+            # One insert_many per write concern
+            fast_ok = self._insert_batch([document for document, fast in pending if fast], fast=True)
+            acknowledged_ok = self._insert_batch([document for document, fast in pending if not fast])
+            return fast_ok and acknowledged_ok
+    
+    def _insert_batch(self, documents, fast=False):
+        if not documents or self.collection is None:
+            return True
+        
+        try:
+            result = self._write_collection(fast).insert_many(documents, ordered=False)
+            logging.info(f"Saved {len(result.inserted_ids)} buffered analyses")
+            return True
+        except Exception as e:
+            logging.error(f"Failed to save buffered analyses: {e}")
+            return False
+    
+    def enqueue_analysis(self, url, content, analysis_result, fast=False):
+        """Buffer an analysis and return immediately; writes happen off the caller's thread"""
+        if self.collection is None:
+            return False
+        
+        document = self._build_document(url, content, analysis_result)
+        if self._buffer_document(document, fast):
+            threading.Thread(target=self.flush, name="analysis-writer", daemon=True).start()
+        return True
+    
+    def get_recent_analyses(self, limit=10, projection=None):
+        """Get recent analysis results (limit and projection are applied server-side)"""
         if self.collection is None:
             return []
         
+        self.flush()
         try:
-            results = self.collection.find().sort("timestamp", -1).limit(limit)
+            results = self.collection.find({}, projection).sort("timestamp", -1).limit(limit)
             return list(results)
         except Exception as e:
             logging.error(f"Failed to get recent analyses: {e}")
             return []
     
-    def search_by_url(self, url):
+    def search_by_url(self, url, include_content=False):
         """Search for existing analysis by URL"""
         if self.collection is None:
             return None
         
+        self.flush()
         try:
-            result = self.collection.find_one({"url": url})
+            projection = None if include_content else {"content": 0}
+            result = self.collection.find_one({"url": url}, projection)
             return result
         except Exception as e:
             logging.error(f"Failed to search by URL: {e}")
@@ -1,20 +1,180 @@
 import openai
 from openai import OpenAI
+import httpx
 import logging
 from config import config
+from concurrent.futures import ThreadPoolExecutor
+import functools
 import json
 import re
 
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so handlers stay the same
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+_JSON_DECODER = json.JSONDecoder()
+
+# Expected response shapes, validated in one pass before the generic fallbacks
+try:
+    from typing import Union
+    from pydantic import BaseModel, ConfigDict, TypeAdapter
+
+    class BiasSchema(BaseModel):
+        model_config = ConfigDict(extra='allow')
+        political_bias: str
+        political_confidence: float
+        emotional_bias: str
+        emotional_confidence: float
+        explanation: str = ""
+
+    class FactOpinionSchema(BaseModel):
+        model_config = ConfigDict(extra='allow')
+        overall_classification: str
+        confidence: float
+        fact_percentage: Union[int, float]
+        opinion_percentage: Union[int, float]
+        reasoning: str = ""
+
+    BIAS_ADAPTER = TypeAdapter(BiasSchema)
+    FACT_OPINION_ADAPTER = TypeAdapter(FactOpinionSchema)
+except ImportError:
+    BIAS_ADAPTER = None
+    FACT_OPINION_ADAPTER = None
+
+# Compiled once at import; _parse_llm_response runs on every LLM reply
+FIELD_PATTERNS = {
+    'political_bias': re.compile(r'"political_bias":\s*"([^"]+)"'),
+    'political_confidence': re.compile(r'"political_confidence":\s*([0-9.]+)'),
+    'emotional_bias': re.compile(r'"emotional_bias":\s*"([^"]+)"'),
+    'emotional_confidence': re.compile(r'"emotional_confidence":\s*([0-9.]+)'),
+    'overall_classification': re.compile(r'"overall_classification":\s*"([^"]+)"'),
+    'confidence': re.compile(r'"confidence":\s*([0-9.]+)'),
+    'explanation': re.compile(r'"explanation":\s*"([^"]*)"'),
+    'reasoning': re.compile(r'"reasoning":\s*"([^"]*)"')
+}
+
+DEFAULT_PROMPTS = {
+    "bias_detection": """
+    Analyze the following text for bias. Return ONLY a valid JSON object with no extra text:
+
+    Text: {text}
+
+    {{
+      "political_bias": "left_leaning",
+      "political_confidence": 0.8,
+      "emotional_bias": "neutral",
+      "emotional_confidence": 0.7,
+      "explanation": "Brief explanation here"
+    }}
+    """,
+    
+    "fact_opinion": """
+    Analyze the following text to classify as facts or opinions. Return ONLY a valid JSON object:
+
+    Text: {text}
+
+    {{
+      "overall_classification": "mostly_factual",
+      "confidence": 0.8,
+      "fact_percentage": 70,
+      "opinion_percentage": 30,
+      "reasoning": "Brief reasoning here"
+    }}
+    """,
+    
+    "source_comparison": """
+    Compare the following sources. Return ONLY a valid JSON object:
+
+    Source 1: {source1}
+    Source 2: {source2}
+
+    {{
+      "factual_consistency": "consistent",
+      "similarity_score": 0.8,
+      "key_differences": "Main differences here",
+      "bias_comparison": "Both sources appear neutral"
+    }}
+    """
+}
+DEFAULT_FALLBACK_PROMPT = "Analyze the following text: {text}"
+
+MAX_CONCURRENT_REQUESTS = 4
+
+# JSON mode makes the API return a syntactically valid object
+RESPONSE_FORMAT = {"type": "json_object"} if config.OPENAI_JSON_MODE else openai.NOT_GIVEN
+
+# Characters of each input sent to the LLM; slicing an already-short str is free
+MAX_INPUT_CHARS = 1500
+
+# HTTP/2 multiplexing needs the optional h2 package
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+def _extract_json_object(content):
+    """Return the first decodable JSON object embedded in content, or None"""
+    idx = content.find('{')
+    while idx != -1:
+        try:
+            parsed, _ = _JSON_DECODER.raw_decode(content, idx)
+            if isinstance(parsed, dict):
+                return parsed
+        except json.JSONDecodeError:
+            pass
+        idx = content.find('{', idx + 1)
+    return None
+
+# System turns are constant per analysis type; only the user turn changes
+BIAS_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are a media bias analyst. Always respond with ONLY a valid JSON object. No additional text, explanations, or markdown formatting."
+}
+FACT_OPINION_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are a fact-checking expert. Always respond with ONLY a valid JSON object. No additional text, explanations, or markdown formatting."
+}
+COMPARISON_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are an expert media analyst. Compare sources objectively and provide detailed analysis in JSON format."
+}
+
+PROMPT_TYPES = ["bias_detection", "fact_opinion", "source_comparison"]
+
+@functools.lru_cache(maxsize=16)
+def _read_prompt_file(prompt_type):
+    """Read a prompt template from disk once per prompt type"""
+    prompt_path = f"prompts/{prompt_type}.txt"
+    with open(prompt_path, 'r') as file:
+        return file.read().strip()
+
 class SourceComparisonAnalyzer:
     def __init__(self):
         self.client = None
         self._initialize_openai_client()
+        
+        # Warm the template cache so the first request skips disk I/O
+        for prompt_type in PROMPT_TYPES:
+            try:
+                _read_prompt_file(prompt_type)
+            except OSError:
+                pass
     
     def _initialize_openai_client(self):
         """Initialize OpenAI client with error handling"""
         try:
             if config.OPENAI_API_KEY and config.OPENAI_API_KEY != "your_openai_api_key_here":
-                self.client = OpenAI(api_key=config.OPENAI_API_KEY)
+                # Keep connections alive between calls to skip repeat TCP/TLS handshakes
+                http_client = httpx.Client(
+                    http2=HTTP2_AVAILABLE,
+                    timeout=30.0,
+                    limits=httpx.Limits(max_keepalive_connections=20, max_connections=40)
+                )
+                self.client = OpenAI(api_key=config.OPENAI_API_KEY, http_client=http_client)
                 logging.info("OpenAI client initialized successfully")
             else:
                 logging.warning("OpenAI API key not provided or is placeholder")
@@ -23,98 +183,62 @@ class SourceComparisonAnalyzer:
             logging.error(f"Failed to initialize OpenAI client: {e}")
             self.client = None
     
-    def load_prompt_template(self, prompt_type):
+    @staticmethod
+    def load_prompt_template(prompt_type):
         """Load prompt template from file"""
         try:
-            prompt_path = f"prompts/{prompt_type}.txt"
-            with open(prompt_path, 'r') as file:
-                return file.read().strip()
+            return _read_prompt_file(prompt_type)
         except Exception as e:
             logging.error(f"Failed to load prompt template {prompt_type}: {e}")
-            return self.get_default_prompt(prompt_type)
+            return SourceComparisonAnalyzer.get_default_prompt(prompt_type)
     
-    def get_default_prompt(self, prompt_type):
+    @staticmethod
+    def get_default_prompt(prompt_type):
         """Get default prompts if files are not available"""
-        prompts = {
-            "bias_detection": """
-            Analyze the following text for bias. Return ONLY a valid JSON object with no extra text:
-
-            Text: {text}
-
-            {{
-              "political_bias": "left_leaning",
-              "political_confidence": 0.8,
-              "emotional_bias": "neutral",
-              "emotional_confidence": 0.7,
-              "explanation": "Brief explanation here"
-            }}
-            """,
-            
-            "fact_opinion": """
-            Analyze the following text to classify as facts or opinions. Return ONLY a valid JSON object:
-
-            Text: {text}
-
-            {{
-              "overall_classification": "mostly_factual",
-              "confidence": 0.8,
-              "fact_percentage": 70,
-              "opinion_percentage": 30,
-              "reasoning": "Brief reasoning here"
-            }}
-            """,
-            
-            "source_comparison": """
-            Compare the following sources. Return ONLY a valid JSON object:
-
-            Source 1: {source1}
-            Source 2: {source2}
-
-            {{
-              "factual_consistency": "consistent",
-              "similarity_score": 0.8,
-              "key_differences": "Main differences here",
-              "bias_comparison": "Both sources appear neutral"
-            }}
-            """
-        }
-        return prompts.get(prompt_type, "Analyze the following text: {text}")
+        return DEFAULT_PROMPTS.get(prompt_type, DEFAULT_FALLBACK_PROMPT)
     
-    def _parse_llm_response(self, content):
+    @staticmethod
+    def _parse_llm_response(content, adapter=None):
         """Robust LLM response parsing with multiple fallback strategies"""
         if not content or not content.strip():
             return {"error": "Empty response from LLM"}
         
         # Remove any markdown formatting
         content = content.strip()
-        if content.startswith('```json'):
-            content = content.replace('```json', '').replace('```', '')
         if content.startswith('```'):
-            content = content.replace('```', '')
+            # Drop the opening fence line (``` or ```json)
+            newline = content.find('\n')
+            if newline != -1:
+                content = content[newline + 1:]
+            else:
+                content = content[7:] if content.startswith('```json') else content[3:]
+        if content.endswith('```'):
+            content = content[:-3]
+        content = content.strip()
+        
+        # Fast path: validate against the expected schema when the caller knows it
+        if adapter is not None:
+            try:
+                return adapter.validate_json(content).model_dump()
+            except ValueError:
+                pass
         
         # Strategy 1: Try direct JSON parsing
         try:
-            parsed = json.loads(content)
+            parsed = _json_loads(content)
             return parsed
         except json.JSONDecodeError as e:
-            print(f"Direct JSON parsing failed: {e}")
+            logging.debug("Direct JSON parsing failed: %s", e)
         
         # Strategy 2: Find and extract JSON block
         try:
-            # Look for JSON pattern with curly braces
-            import re
-            json_pattern = r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}'
-            matches = re.findall(json_pattern, content, re.DOTALL)
-            
-            for match in matches:
-                try:
-                    parsed = json.loads(match)
-                    return parsed
-                except json.JSONDecodeError:
-                    continue
+            # Decode from each opening brace; linear scan, no regex backtracking
+            parsed = _extract_json_object(content)
+            if parsed is not None:
+                return parsed
                     
         except Exception as e:
-            print(f"JSON extraction failed: {e}")
+            logging.debug("JSON extraction failed: %s", e)
         
         # Strategy 3: Try to fix common JSON issues
         try:
@@ -128,7 +252,7 @@ class SourceComparisonAnalyzer:
                 fixed_content += '}' * (open_braces - close_braces)
             
             # Try parsing fixed content
-            parsed = json.loads(fixed_content)
+            parsed = _json_loads(fixed_content)
             return parsed
             
         except json.JSONDecodeError:
@@ -138,20 +262,8 @@ class SourceComparisonAnalyzer:
         try:
             result = {}
             
-            # Common patterns to extract
-            patterns = {
-                'political_bias': r'"political_bias":\s*"([^"]+)"',
-                'political_confidence': r'"political_confidence":\s*([0-9.]+)',
-                'emotional_bias': r'"emotional_bias":\s*"([^"]+)"',
-                'emotional_confidence': r'"emotional_confidence":\s*([0-9.]+)',
-                'overall_classification': r'"overall_classification":\s*"([^"]+)"',
-                'confidence': r'"confidence":\s*([0-9.]+)',
-                'explanation': r'"explanation":\s*"([^"]*)"',
-                'reasoning': r'"reasoning":\s*"([^"]*)"'
-            }
-            
-            for key, pattern in patterns.items():
-                match = re.search(pattern, content)
+            for key, pattern in FIELD_PATTERNS.items():
+                match = pattern.search(content)
                 if match:
                     value = match.group(1)
                     # Convert to float if it's a number
@@ -166,7 +278,7 @@ class SourceComparisonAnalyzer:
                 return result
                 
         except Exception as e:
-            print(f"Regex extraction failed: {e}")
+            logging.debug("Regex extraction failed: %s", e)
         
         # Strategy 5: Return structured fallback
         return {
@@ -178,6 +290,33 @@ class SourceComparisonAnalyzer:
             "status": "completed_with_issues"
         }
     
+    def _stream_completion(self, **request):
+        """Stream a chat completion, stopping once a complete JSON object has arrived"""
+        stream = self.client.chat.completions.create(stream=True, **request)
+        parts = []
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                parts.append(delta)
+                
+                # Anything after the closing brace is noise we don't need to wait for
+                if '}' in delta:
+                    buffer = ''.join(parts)
+                    start = buffer.find('{')
+                    if start != -1:
+                        try:
+                            _JSON_DECODER.raw_decode(buffer, start)
+                            break
+                        except json.JSONDecodeError:
+                            pass
+        finally:
+            stream.close()
+        return ''.join(parts)
+    
     def analyze_bias_with_llm(self, text):
         """Use LLM to analyze bias in text"""
         if not self.client:
@@ -185,25 +324,19 @@ class SourceComparisonAnalyzer:
         
         try:
             prompt_template = self.get_default_prompt("bias_detection")
-            prompt = prompt_template.format(text=text[:1500])  # Shorter text
+            prompt = prompt_template.format(text=text[:MAX_INPUT_CHARS])  # Shorter text
             
-            response = self.client.chat.completions.create(
+            content = self._stream_completion(
                 model=config.OPENAI_MODEL,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are a media bias analyst. Always respond with ONLY a valid JSON object. No additional text, explanations, or markdown formatting."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
+                response_format=RESPONSE_FORMAT,
+                messages=[BIAS_SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
                 max_tokens=300,  # Shorter response
                 temperature=0.1,  # More deterministic
                 top_p=0.9
             )
             
-            content = response.choices[0].message.content
-            print(f"LLM Bias Response: {content[:100]}...")  # Debug
-            return self._parse_llm_response(content)
+            logging.debug("LLM Bias Response: %.100s...", content)
+            return self._parse_llm_response(content, BIAS_ADAPTER)
             
         except Exception as e:
             logging.error(f"Error in LLM bias analysis: {e}")
@@ -216,25 +349,19 @@ class SourceComparisonAnalyzer:
         
         try:
             prompt_template = self.get_default_prompt("fact_opinion")
-            prompt = prompt_template.format(text=text[:1500])
+            prompt = prompt_template.format(text=text[:MAX_INPUT_CHARS])
             
-            response = self.client.chat.completions.create(
+            content = self._stream_completion(
                 model=config.OPENAI_MODEL,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are a fact-checking expert. Always respond with ONLY a valid JSON object. No additional text, explanations, or markdown formatting."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
+                response_format=RESPONSE_FORMAT,
+                messages=[FACT_OPINION_SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
                 max_tokens=300,
                 temperature=0.1,
                 top_p=0.9
             )
             
-            content = response.choices[0].message.content
-            print(f"LLM Fact/Opinion Response: {content[:100]}...")  # Debug
-            return self._parse_llm_response(content)
+            logging.debug("LLM Fact/Opinion Response: %.100s...", content)
+            return self._parse_llm_response(content, FACT_OPINION_ADAPTER)
             
         except Exception as e:
             logging.error(f"Error in LLM fact/opinion analysis: {e}")
@@ -248,21 +375,18 @@ class SourceComparisonAnalyzer:
         try:
             prompt_template = self.load_prompt_template("source_comparison")
             prompt = prompt_template.format(
-                source1=source1[:1500],  # Limit length
-                source2=source2[:1500]
+                source1=source1[:MAX_INPUT_CHARS],  # Limit length
+                source2=source2[:MAX_INPUT_CHARS]
             )
             
-            response = self.client.chat.completions.create(
+            content = self._stream_completion(
                 model=config.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are an expert media analyst. Compare sources objectively and provide detailed analysis in JSON format."},
-                    {"role": "user", "content": prompt}
-                ],
+                response_format=RESPONSE_FORMAT,
+                messages=[COMPARISON_SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
                 max_tokens=config.MAX_TOKENS,
                 temperature=config.TEMPERATURE
             )
             
-            content = response.choices[0].message.content
             return self._parse_llm_response(content)
             
         except Exception as e:
@@ -272,22 +396,32 @@ class SourceComparisonAnalyzer:
     def comprehensive_llm_analysis(self, text, additional_sources=None):
         """Perform comprehensive analysis using LLM"""
         results = {}
+        # Truncate once here rather than in every request below
+        text = text[:MAX_INPUT_CHARS]
+        sources = [source[:MAX_INPUT_CHARS] for source in additional_sources or []]
         
-        # Bias analysis
-        results["bias_analysis"] = self.analyze_bias_with_llm(text)
-        
-        # Fact vs opinion analysis
-        results["fact_opinion_analysis"] = self.classify_fact_opinion_with_llm(text)
-        
-        # Source comparison if additional sources provided
-        if additional_sources:
-            results["source_comparisons"] = []
-            for i, source in enumerate(additional_sources):
-                comparison = self.compare_sources_with_llm(text, source)
-                results["source_comparisons"].append({
-                    "source_index": i,
-                    "comparison": comparison
-                })
+        # The requests are independent and network-bound, so issue them together
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+            # Bias analysis
+            bias_future = executor.submit(self.analyze_bias_with_llm, text)
+            
+            # Fact vs opinion analysis
+            fact_opinion_future = executor.submit(self.classify_fact_opinion_with_llm, text)
+            
+            # Source comparison if additional sources provided
+            comparison_futures = [
+                executor.submit(self.compare_sources_with_llm, text, source)
+                for source in sources
+            ]
+            
+            results["bias_analysis"] = bias_future.result()
+            results["fact_opinion_analysis"] = fact_opinion_future.result()
+            
+            if sources:
+                results["source_comparisons"] = [
+                    {"source_index": i, "comparison": future.result()}
+                    for i, future in enumerate(comparison_futures)
+                ]
         
         return results
 
@@ -1,23 +1,92 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import functools
 import json
+import threading
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
-# Import our modules
+# Import our modules (plotting and the analyzers are imported inside the
+# functions that use them so reruns only pay for what they touch)
 from config import config
 from database import db_manager
 from scraping.extractor import content_extractor
-from nlp.classifier import fact_opinion_classifier
-from nlp.sentiment_bias import sentiment_bias_analyzer
-from nlp.similarity import similarity_analyzer
-from llm.source_comparison import source_comparison_analyzer
-from utils.helpers import is_valid_url, format_timestamp, setup_logging
+from utils.helpers import is_valid_url, format_timestamp, truncate_text, setup_logging
 
 # Setup logging
 setup_logging()
 
+# Analyzers are built once per server process and shared by every session
+@st.cache_resource(show_spinner=False)
+def get_fact_opinion_classifier():
+    from nlp.classifier import fact_opinion_classifier
+    return fact_opinion_classifier
+
+@st.cache_resource(show_spinner=False)
+def get_sentiment_bias_analyzer():
+    from nlp import sentiment_bias
+    return sentiment_bias.get_sentiment_bias_analyzer()
+
+@st.cache_resource(show_spinner=False)
+def get_similarity_analyzer():
+    from nlp import similarity
+    return similarity.get_similarity_analyzer()
+
+@st.cache_resource(show_spinner=False)
+def get_source_comparison_analyzer():
+    from llm.source_comparison import source_comparison_analyzer
+    return source_comparison_analyzer
+
+class _ErrorResult(Exception):
+    """Carries an error result out of a cached function so st.cache_data does not store it"""
+    def __init__(self, result):
+        super().__init__(result)
+        self.result = result
+
+def _raise_on_error(result):
+    """Raise _ErrorResult if result, or one of its sub-results, is an {"error": ...} dict"""
+    if "error" in result or any(isinstance(value, dict) and "error" in value for value in result.values()):
+        raise _ErrorResult(result)
+    return result
+
+def _skip_caching_errors(cached_func):
+    """Return error results from cached_func to the caller without caching them"""
+    @functools.wraps(cached_func)
+    def wrapper(*args, **kwargs):
+        try:
+            return cached_func(*args, **kwargs)
+        except _ErrorResult as e:
+            return e.result
+    return wrapper
+
+# Streamlit reruns the whole script on every interaction; keep results for
+# text we have already analysed instead of recomputing them on each rerun.
+# Failures (often transient network or API errors) are retried on the next call.
+# The caches are process-wide, so bound them by age and entry count.
+RESULT_CACHE_TTL = 3600  # seconds
+RESULT_CACHE_MAX_ENTRIES = 256
+
+@_skip_caching_errors
+@st.cache_data(show_spinner=False, ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES)
+def _cached_extract_from_url(url):
+    return _raise_on_error(content_extractor.extract_from_url(url))
+
+# The sentence split and lowercasing happen inside the analyzers, so cache hits skip them
+@_skip_caching_errors
+@st.cache_data(show_spinner=False, ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES)
+def _cached_fact_opinion(text):
+    return _raise_on_error(get_fact_opinion_classifier().classify_text(text))
+
+@_skip_caching_errors
+@st.cache_data(show_spinner=False, ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES)
+def _cached_bias(text):
+    return _raise_on_error(get_sentiment_bias_analyzer().comprehensive_bias_analysis(text))
+
+@_skip_caching_errors
+@st.cache_data(show_spinner=False, ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES)
+def _cached_llm(text):
+    return _raise_on_error(get_source_comparison_analyzer().comprehensive_llm_analysis(text))
+
 def main():
     st.set_page_config(
         page_title="SourceShield - News Analysis Tool",
@@ -72,7 +141,7 @@ def analyze_single_source(url, text):
         
         # Extract content
         if url:
-            content_data = content_extractor.extract_from_url(url)
+            content_data = _cached_extract_from_url(url)
         else:
             content_data = content_extractor.extract_from_text(text)
         
@@ -111,23 +180,41 @@ def analyze_single_source(url, text):
         # Run all analyses with error handling
         with st.spinner("Running comprehensive analysis..."):
             
+            # The LLM call is network-bound, so run all three side by side.
+            # Workers get the script context for st.cache_data; st.warning
+            # calls stay on this thread.
+            ctx = get_script_run_ctx()
+            with ThreadPoolExecutor(
+                max_workers=3,
+                initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx)
+            ) as executor:
+                fact_opinion_future = executor.submit(_cached_fact_opinion, article_text)
+                bias_future = executor.submit(_cached_bias, article_text)
+                llm_future = executor.submit(_cached_llm, article_text)
+            
+            # Set by each analysis that comes back without an error
+            any_ok = False
+            
             # 1. Fact vs Opinion Classification
             try:
-                fact_opinion_result = fact_opinion_classifier.classify_text(article_text)
+                fact_opinion_result = fact_opinion_future.result()
+                any_ok = any_ok or "error" not in fact_opinion_result
             except Exception as e:
                 st.warning(f"Fact/Opinion analysis failed: {str(e)}")
                 fact_opinion_result = {"error": str(e)}
             
             # 2. Sentiment and Bias Analysis
             try:
-                bias_result = sentiment_bias_analyzer.comprehensive_bias_analysis(article_text)
+                bias_result = bias_future.result()
+                any_ok = any_ok or "error" not in bias_result
             except Exception as e:
                 st.warning(f"Bias analysis failed: {str(e)}")
                 bias_result = {"error": str(e)}
             
             # 3. LLM Analysis (if available)
             try:
-                llm_result = source_comparison_analyzer.comprehensive_llm_analysis(article_text)
+                llm_result = llm_future.result()
+                any_ok = any_ok or "error" not in llm_result
             except Exception as e:
                 st.warning(f"AI analysis failed: {str(e)}")
                 llm_result = {"error": str(e)}
@@ -136,7 +223,7 @@ def analyze_single_source(url, text):
         display_analysis_results(fact_opinion_result, bias_result, llm_result)
         
         # Save to database (only if at least one analysis succeeded)
-        if not all("error" in result for result in [fact_opinion_result, bias_result, llm_result]):
+        if any_ok:
             analysis_data = {
                 "fact_opinion": fact_opinion_result,
                 "bias_analysis": bias_result,
@@ -144,14 +231,12 @@ def analyze_single_source(url, text):
                 "timestamp": datetime.now()
             }
             
-            try:
-                db_manager.save_analysis(
-                    url or "direct_input",
-                    article_text,
-                    analysis_data
-                )
-            except Exception as e:
-                st.warning(f"Failed to save analysis to database: {str(e)}")
+            # Written in the background so the user doesn't wait on MongoDB
+            db_manager.enqueue_analysis(
+                url or "direct_input",
+                article_text,
+                analysis_data
+            )
 
 def display_analysis_results(fact_opinion_result, bias_result, llm_result):
     """Display comprehensive analysis results"""
@@ -201,6 +286,8 @@ def display_analysis_results(fact_opinion_result, bias_result, llm_result):
 
 def create_overview_charts(fact_opinion_result, bias_result):
     """Create overview visualizations"""
+    import plotly.express as px
+    import plotly.graph_objects as go
     
     col1, col2 = st.columns(2)
     
@@ -274,21 +361,18 @@ def display_fact_opinion_results(fact_opinion_result):
         
         breakdown = fact_opinion_result['sentence_breakdown']
         
-        # Create DataFrame for display
-        df_data = []
-        for i, item in enumerate(breakdown[:10]):  # Show first 10 sentences
-            df_data.append({
-                'Sentence': item['sentence'][:100] + "..." if len(item['sentence']) > 100 else item['sentence'],
-                'Classification': item['classification'].title(),
-                'Confidence': f"{item['confidence']:.2f}"
-            })
-        
-        if df_data:
-            df = pd.DataFrame(df_data)
-            st.dataframe(df, use_container_width=True)
+        # Table of the first 10 sentences; st.dataframe takes the columns directly
+        sentences = breakdown['sentences'][:10]
+        if sentences:
+            st.dataframe({
+                'Sentence': [s[:100] + "..." if len(s) > 100 else s for s in sentences],
+                'Classification': [c.title() for c in breakdown['classifications'][:10]],
+                'Confidence': [f"{c:.2f}" for c in breakdown['confidences'][:10]]
+            }, use_container_width=True)
 
 def display_bias_results(bias_result):
     """Display bias analysis results"""
+    import plotly.express as px
     
     if 'error' in bias_result:
         st.error(bias_result['error'])
@@ -308,9 +392,9 @@ def display_bias_results(bias_result):
             
             # Sentiment scores chart
             if 'all_scores' in sentiment:
-                scores_df = pd.DataFrame(list(sentiment['all_scores'].items()), 
-                                       columns=['Sentiment', 'Score'])
-                fig = px.bar(scores_df, x='Sentiment', y='Score', 
+                scores = sentiment['all_scores']
+                fig = px.bar(x=list(scores.keys()), y=list(scores.values()),
+                           labels={'x': 'Sentiment', 'y': 'Score'},
                            title="Sentiment Scores")
                 st.plotly_chart(fig, use_container_width=True)
     
@@ -328,9 +412,8 @@ def display_bias_results(bias_result):
         # Keyword counts
         if 'keyword_counts' in political:
             counts = political['keyword_counts']
-            counts_df = pd.DataFrame(list(counts.items()), 
-                                   columns=['Bias Type', 'Count'])
-            fig = px.bar(counts_df, x='Bias Type', y='Count', 
+            fig = px.bar(x=list(counts.keys()), y=list(counts.values()),
+                       labels={'x': 'Bias Type', 'y': 'Count'},
                        title="Political Bias Keyword Counts")
             st.plotly_chart(fig, use_container_width=True)
     
@@ -407,6 +490,24 @@ def multi_source_comparison():
         else:
             st.error("Please provide at least 2 sources to compare")
 
+def _extract_and_analyze_source(source, classifier):
+    """Extract one source and run the fact/opinion analysis (runs in a worker thread)"""
+    source_type, source_data = source
+    if source_type == "url":
+        content_data = content_extractor.extract_from_url(source_data)
+    else:
+        content_data = content_extractor.extract_from_text(source_data)
+    
+    if "error" in content_data:
+        return None, None
+    
+    # Analyze each source
+    article_text = content_data.get('content', '')
+    analysis = {
+        'fact_opinion': classifier.classify_text(article_text)
+    }
+    return content_data, analysis
+
 def compare_multiple_sources(sources):
     """Compare multiple sources"""
     with st.spinner("Extracting and analyzing all sources..."):
@@ -414,23 +515,24 @@ def compare_multiple_sources(sources):
         source_contents = []
         source_analyses = []
         
-        # Extract content from all sources
-        for i, (source_type, source_data) in enumerate(sources):
-            if source_type == "url":
-                content_data = content_extractor.extract_from_url(source_data)
-            else:
-                content_data = content_extractor.extract_from_text(source_data)
-            
-            if "error" not in content_data:
-                source_contents.append(content_data)
-                
-                # Analyze each source
-                article_text = content_data.get('content', '')
-                analysis = {
-                    'fact_opinion': fact_opinion_classifier.classify_text(article_text),
-                    'bias': sentiment_bias_analyzer.comprehensive_bias_analysis(article_text)
-                }
-                source_analyses.append(analysis)
+        # Extract content from all sources concurrently; map keeps input order
+        with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+            # Resolve the cached analyzers here; workers have no Streamlit context
+            analyze = functools.partial(
+                _extract_and_analyze_source,
+                classifier=get_fact_opinion_classifier()
+            )
+            for content_data, analysis in executor.map(analyze, sources):
+                if content_data is not None:
+                    source_contents.append(content_data)
+                    source_analyses.append(analysis)
+        
+        # One batched pass through the sentiment model for all sources
+        bias_results = get_sentiment_bias_analyzer().comprehensive_bias_analysis_batch(
+            [content_data.get('content', '') for content_data in source_contents]
+        )
+        for analysis, bias_result in zip(source_analyses, bias_results):
+            analysis['bias'] = bias_result
         
         if len(source_contents) < 2:
             st.error("Could not extract content from enough sources")
@@ -469,15 +571,14 @@ def display_source_comparison(source_contents, source_analyses):
             'Sentiment': sentiment.title()
         })
     
-    df = pd.DataFrame(comparison_data)
-    st.dataframe(df, use_container_width=True)
+    st.dataframe(comparison_data, use_container_width=True)
     
     # Similarity analysis
     if len(source_contents) >= 2:
         st.subheader("Content Similarity Analysis")
         
         texts = [content.get('content', '') for content in source_contents]
-        similarity_result = similarity_analyzer.detect_content_overlap(texts)
+        similarity_result = get_similarity_analyzer().detect_content_overlap(texts)
         
         if 'error' not in similarity_result:
             col1, col2 = st.columns(2)
@@ -497,7 +598,10 @@ def historical_analysis():
     st.header("Historical Analysis")
     
     # Get recent analyses from database
-    recent_analyses = db_manager.get_recent_analyses(20)
+    # The table only needs these fields; leave the analysis payloads on the server
+    recent_analyses = db_manager.get_recent_analyses(
+        20, projection={"timestamp": 1, "url": 1, "content": 1}
+    )
     
     if not recent_analyses:
         st.info("No previous analyses found. Analyze some articles first!")
@@ -506,17 +610,12 @@ def historical_analysis():
     # Display recent analyses
     st.subheader("Recent Analyses")
     
-    analyses_data = []
-    for analysis in recent_analyses:
-        analyses_data.append({
-            'Timestamp': format_timestamp(analysis.get('timestamp')),
-            'URL/Source': analysis.get('url', 'N/A')[:50] + "..." if len(analysis.get('url', '')) > 50 else analysis.get('url', 'N/A'),
-            'Content Preview': analysis.get('content', '')[:100] + "..." if len(analysis.get('content', '')) > 100 else analysis.get('content', '')
-        })
-    
-    if analyses_data:
-        df = pd.DataFrame(analyses_data)
-        st.dataframe(df, use_container_width=True)
+    # Build the table column by column
+    st.dataframe({
+        'Timestamp': [format_timestamp(a.get('timestamp')) for a in recent_analyses],
+        'URL/Source': [truncate_text(a.get('url', 'N/A'), 50) for a in recent_analyses],
+        'Content Preview': [truncate_text(a.get('content', ''), 100) for a in recent_analyses]
+    }, use_container_width=True)
     
     # Analytics
     st.subheader("Analysis Trends")
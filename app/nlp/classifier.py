@@ -1,11 +1,74 @@
 import re
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import Pipeline
 import numpy as np
 from utils.text_cleaner import text_cleaner
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+def _build_automaton(phrases):
+    """Compile phrases into one Aho-Corasick automaton (payload = phrase index)"""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for index, phrase in enumerate(phrases):
+        automaton.add_word(phrase, index)
+    automaton.make_automaton()
+    return automaton
+
+# Sentence class ids used by the batch path in classify_text
+FACT, OPINION, NEUTRAL, UNKNOWN = range(4)
+CLASS_LABELS = ("fact", "opinion", "neutral", "unknown")
+
+# Indicator hits at which confidence reaches its 0.9 cap (0.5 + 4 * 0.1)
+SATURATED_COUNT = 4
+
+# Above this many sentences classify_text works on a uniform sample
+MAX_CLASSIFIED_SENTENCES = 200
+
+@njit(cache=True)
+def _score_sentences(fact_counts, opinion_counts, factual_mask, opinion_mask, empty_mask):
+    """Apply the rule ladder to every sentence; returns (classes, confidences)"""
+    n = fact_counts.shape[0]
+    classes = np.empty(n, dtype=np.int8)
+    confidences = np.empty(n, dtype=np.float64)
+    for i in range(n):
+        fact_count = fact_counts[i]
+        opinion_count = opinion_counts[i]
+        if empty_mask[i]:
+            classes[i] = UNKNOWN
+            confidences[i] = 0.0
+        elif fact_count > opinion_count:
+            classes[i] = FACT
+            confidences[i] = min(0.9, 0.5 + (fact_count * 0.1))
+        elif opinion_count > fact_count:
+            classes[i] = OPINION
+            confidences[i] = min(0.9, 0.5 + (opinion_count * 0.1))
+        # Check for other patterns
+        elif factual_mask[i]:
+            classes[i] = FACT
+            confidences[i] = 0.6
+        elif opinion_mask[i]:
+            classes[i] = OPINION
+            confidences[i] = 0.6
+        else:
+            classes[i] = NEUTRAL
+            confidences[i] = 0.5
+    return classes, confidences
+
 class FactOpinionClassifier:
+    __slots__ = (
+        'fact_indicators', 'opinion_indicators', 'pipeline',
+        '_fact_ac', '_opinion_ac', '_fact_re', '_opinion_re'
+    )
+    
     def __init__(self):
         self.fact_indicators = [
             'according to', 'reported', 'stated', 'announced', 'confirmed',
@@ -21,132 +84,175 @@ class FactOpinionClassifier:
             'love', 'hate', 'prefer', 'wish', 'hope', 'feel', 'personally'
         ]
         
-        # Initialize a simple pipeline
+        factual_patterns = [
+            r'\d+\%',  # percentages
+            r'\d+\s*(million|billion|thousand)',  # large numbers
+            r'(january|february|march|april|may|june|july|august|september|october|november|december)\s+\d+',  # dates
+            r'\d+\s*(years|months|days|hours)',  # time periods
+            r'(increase|decrease|rise|fall|drop)\s+of\s+\d+',  # statistical changes
+        ]
+        
+        opinion_patterns = [
+            r'(very|extremely|incredibly|absolutely|totally)\s+\w+',  # intensifiers
+            r'(good|bad|great|terrible|amazing|awful|wonderful|horrible)',  # subjective adjectives
+            r'(should|must|need to|have to|ought to)',  # modal verbs
+        ]
+        
+        # One alternation per group, so each check is a single regex search
+        self._fact_re = re.compile('|'.join(f'(?:{p})' for p in factual_patterns), re.IGNORECASE)
+        self._opinion_re = re.compile('|'.join(f'(?:{p})' for p in opinion_patterns), re.IGNORECASE)
+        
+        # Single-pass matchers over each indicator list
+        self._fact_ac = _build_automaton(self.fact_indicators)
+        self._opinion_ac = _build_automaton(self.opinion_indicators)
+        
+        # The TF-IDF pipeline is not used by the rule-based path; build it on demand
         self.pipeline = None
-        self._create_simple_classifier()
     
-    def _create_simple_classifier(self):
-        """Create a simple TF-IDF based classifier"""
-
-        self.pipeline = Pipeline([        
-            ('tfidf', TfidfVectorizer(max_features=1000, ngram_range=(1, 2))),
-            ('classifier', LogisticRegression())
-        ])
+    def _get_pipeline(self):
+        """Create a simple TF-IDF based classifier on first use"""
+        if self.pipeline is None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            from sklearn.linear_model import LogisticRegression
+            from sklearn.pipeline import Pipeline
+            
+            self.pipeline = Pipeline([        
+                ('tfidf', TfidfVectorizer(max_features=1000, ngram_range=(1, 2))),
+                ('classifier', LogisticRegression())
+            ])
+        return self.pipeline
     
     def classify_sentence(self, sentence):
         """Classify a single sentence as fact or opinion"""
-        if not sentence or not sentence.strip():
+        classes, confidences, fact_counts, opinion_counts = self._classify_sentences([sentence])
+        if classes[0] == UNKNOWN:
             return {"classification": "unknown", "confidence": 0.0}
         
-        sentence_lower = sentence.lower()
+        return {
+            "classification": CLASS_LABELS[classes[0]],
+            "confidence": float(confidences[0]),
+            "fact_indicators": int(fact_counts[0]),
+            "opinion_indicators": int(opinion_counts[0])
+        }
+    
+    def _classify_sentences(self, sentences, exact_counts=True):
+        """Gather per-sentence features in one pass, then score them all at once
+        
+        With exact_counts=False the fact count stops once the outcome is fixed:
+        at max(4, opinion_count + 1) hits the sentence is a fact at the 0.9 cap.
+        """
+        n = len(sentences)
+        fact_counts = np.zeros(n, dtype=np.int32)
+        opinion_counts = np.zeros(n, dtype=np.int32)
+        factual_mask = np.zeros(n, dtype=np.bool_)
+        opinion_mask = np.zeros(n, dtype=np.bool_)
+        empty_mask = np.zeros(n, dtype=np.bool_)
         
-        # Count fact and opinion indicators
-        fact_count = sum(1 for indicator in self.fact_indicators if indicator in sentence_lower)
-        opinion_count = sum(1 for indicator in self.opinion_indicators if indicator in sentence_lower)
+        for i, sentence in enumerate(sentences):
+            # isspace() tests for blank sentences without allocating a stripped copy
+            if not sentence or sentence.isspace():
+                empty_mask[i] = True
+                continue
+            
+            # The only lowercased copy; the pattern regexes match case-insensitively
+            sentence_lower = sentence.lower()
+            
+            # Count fact and opinion indicators
+            opinion_count = self._count_indicators(self._opinion_ac, self.opinion_indicators, sentence_lower)
+            limit = None if exact_counts else max(SATURATED_COUNT, opinion_count + 1)
+            fact_count = self._count_indicators(self._fact_ac, self.fact_indicators, sentence_lower, limit)
+            fact_counts[i] = fact_count
+            opinion_counts[i] = opinion_count
+            
+            # Pattern checks only decide ties, so skip them otherwise
+            if fact_count == opinion_count:
+                factual_mask[i] = self._has_factual_patterns(sentence)
+                if not factual_mask[i]:
+                    opinion_mask[i] = self._has_opinion_patterns(sentence)
         
-        # Simple rule-based classification
-        if fact_count > opinion_count:
-            classification = "fact"
-            confidence = min(0.9, 0.5 + (fact_count * 0.1))
-        elif opinion_count > fact_count:
-            classification = "opinion"
-            confidence = min(0.9, 0.5 + (opinion_count * 0.1))
+        classes, confidences = _score_sentences(
+            fact_counts, opinion_counts, factual_mask, opinion_mask, empty_mask
+        )
+        return classes, confidences, fact_counts, opinion_counts
+    
+    def _count_indicators(self, automaton, indicators, sentence_lower, limit=None):
+        """Count how many distinct indicators occur in the sentence, stopping at limit"""
+        if automaton is None:
+            matches = (index for index, indicator in enumerate(indicators) if indicator in sentence_lower)
         else:
-            # Check for other patterns
-            if self._has_factual_patterns(sentence):
-                classification = "fact"
-                confidence = 0.6
-            elif self._has_opinion_patterns(sentence):
-                classification = "opinion"
-                confidence = 0.6
-            else:
-                classification = "neutral"
-                confidence = 0.5
+            matches = (index for _, index in automaton.iter(sentence_lower))
         
-        return {
-            "classification": classification,
-            "confidence": confidence,
-            "fact_indicators": fact_count,
-            "opinion_indicators": opinion_count
-        }
+        seen = set()
+        for index in matches:
+            seen.add(index)
+            if limit is not None and len(seen) >= limit:
+                break
+        return len(seen)
     
     def _has_factual_patterns(self, sentence):
         """Check for factual patterns in sentence"""
-        factual_patterns = [
-            r'\d+\%',  # percentages
-            r'\d+\s*(million|billion|thousand)',  # large numbers
-            r'(january|february|march|april|may|june|july|august|september|october|november|december)\s+\d+',  # dates
-            r'\d+\s*(years|months|days|hours)',  # time periods
-            r'(increase|decrease|rise|fall|drop)\s+of\s+\d+',  # statistical changes
-        ]
-        
-        for pattern in factual_patterns:
-            if re.search(pattern, sentence.lower()):
-                return True
-        return False
+        return self._fact_re.search(sentence) is not None
     
     def _has_opinion_patterns(self, sentence):
         """Check for opinion patterns in sentence"""
-        opinion_patterns = [
-            r'(very|extremely|incredibly|absolutely|totally)\s+\w+',  # intensifiers
-            r'(good|bad|great|terrible|amazing|awful|wonderful|horrible)',  # subjective adjectives
-            r'(should|must|need to|have to|ought to)',  # modal verbs
-        ]
-        
-        for pattern in opinion_patterns:
-            if re.search(pattern, sentence.lower()):
-                return True
-        return False
+        return self._opinion_re.search(sentence) is not None
     
-    def classify_text(self, text):
-        """Classify entire text by analyzing sentences"""
+    def classify_text(self, text, sentences=None):
+        """Classify entire text by analyzing sentences (pass sentences if already split)"""
         if not text or not text.strip():
             return {"error": "Empty text provided"}
         
-        sentences = text_cleaner.tokenize_sentences(text)
+        if sentences is None:
+            sentences = text_cleaner.tokenize_sentences(text)
         if not sentences:
             return {"error": "No sentences found"}
         
-        results = []
-        fact_count = 0
-        opinion_count = 0
-        neutral_count = 0
-        
-        for sentence in sentences:
-            result = self.classify_sentence(sentence)
-            results.append({
-                "sentence": sentence,
-                "classification": result["classification"],
-                "confidence": result["confidence"]
-            })
-            
-            if result["classification"] == "fact":
-                fact_count += 1
-            elif result["classification"] == "opinion":
-                opinion_count += 1
-            else:
-                neutral_count += 1
-        
+        # Long articles: classify a fixed-seed uniform sample and scale the counts
         total_sentences = len(sentences)
+        if total_sentences > MAX_CLASSIFIED_SENTENCES:
+            indices = np.sort(np.random.default_rng(0).choice(
+                total_sentences, MAX_CLASSIFIED_SENTENCES, replace=False
+            ))
+            sentences = [sentences[i] for i in indices]
+        analyzed_sentences = len(sentences)
+        
+        # Score every sentence into flat arrays, then tally in one go
+        classes, confidences, _, _ = self._classify_sentences(sentences, exact_counts=False)
+        
+        counts = np.bincount(classes, minlength=len(CLASS_LABELS))
+        fact_hits = int(counts[FACT])
+        opinion_hits = int(counts[OPINION])
+        scale = total_sentences / analyzed_sentences
+        fact_count = round(fact_hits * scale)
+        opinion_count = round(opinion_hits * scale)
+        neutral_count = max(0, total_sentences - fact_count - opinion_count)
+        
+        # Columnar breakdown: one list per field rather than a dict per sentence
+        breakdown = {
+            "sentences": list(sentences),
+            "classifications": [CLASS_LABELS[class_id] for class_id in classes.tolist()],
+            "confidences": confidences.tolist()
+        }
         
         # Overall classification
-        if fact_count > opinion_count:
+        if fact_hits > opinion_hits:
             overall_classification = "mostly_factual"
-        elif opinion_count > fact_count:
+        elif opinion_hits > fact_hits:
             overall_classification = "mostly_opinion"
         else:
             overall_classification = "mixed"
         
         return {
             "overall_classification": overall_classification,
-            "sentence_breakdown": results,
+            "sentence_breakdown": breakdown,
             "statistics": {
                 "total_sentences": total_sentences,
+                "analyzed_sentences": analyzed_sentences,
                 "fact_sentences": fact_count,
                 "opinion_sentences": opinion_count,
                 "neutral_sentences": neutral_count,
-                "fact_percentage": round((fact_count / total_sentences) * 100, 1),
-                "opinion_percentage": round((opinion_count / total_sentences) * 100, 1)
+                "fact_percentage": round((fact_hits / analyzed_sentences) * 100, 1),
+                "opinion_percentage": round((opinion_hits / analyzed_sentences) * 100, 1)
             }
         }
 
@@ -1,19 +1,223 @@
-from transformers import pipeline
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+import functools
 import logging
+import os
+import re
+import threading
+import numpy as np
+from config import config
 from utils.text_cleaner import text_cleaner
+from utils.nlp_cache import cache_key, get_cached, set_cached
 
-class SentimentBiasAnalyzer:
-    def __init__(self):
-        try:
-            # Load sentiment analysis pipeline
-            self.sentiment_analyzer = pipeline(
-                "sentiment-analysis",
-                model="cardiffnlp/twitter-roberta-base-sentiment-latest",
-                return_all_scores=True
+try:
+    import torch
+except ImportError:
+    torch = None
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+# Exported ONNX models are kept here so the export only happens once
+ONNX_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sourceshield", "onnx")
+
+# Most sentiment models have token limits around 512 tokens
+# Approximate: 1 token ≈ 4 characters for English
+SENTIMENT_MAX_CHARS = 400  # Safe limit for most models
+
+# (max tokens, batch size) buckets used by analyze_many; shorter inputs get bigger batches
+SENTIMENT_BUCKETS = [(64, 64), (128, 32), (256, 16), (512, 8)]
+
+def _build_group_automaton(keyword_groups):
+    """Compile every group's keywords into one automaton (payload = (keyword, groups))"""
+    if ahocorasick is None:
+        return None
+    groups_by_keyword = {}
+    for group, keywords in keyword_groups.items():
+        for keyword in keywords:
+            groups_by_keyword.setdefault(keyword, []).append(group)
+    
+    automaton = ahocorasick.Automaton()
+    for keyword, groups in groups_by_keyword.items():
+        automaton.add_word(keyword, (keyword, tuple(groups)))
+    automaton.make_automaton()
+    return automaton
+
+def _build_group_patterns(keyword_groups):
+    """Compile each group into one lookahead alternation that reports every keyword hit
+    
+    Each start position reports a single alternative, so a group where one
+    keyword is a prefix of another gets None and keeps the substring scan.
+    """
+    patterns = {}
+    for group, keywords in keyword_groups.items():
+        ordered = sorted(set(keywords))
+        if not ordered or any(b.startswith(a) for a, b in zip(ordered, ordered[1:])):
+            patterns[group] = None
+        else:
+            patterns[group] = re.compile('(?=(' + '|'.join(map(re.escape, ordered)) + '))')
+    return patterns
+
+@functools.lru_cache(maxsize=None)
+def _compile_hyperscan(keywords):
+    """Compile keywords into one Hyperscan database (pattern id = keyword index)
+    
+    Returns (database, lock). Counters with the same keywords share the
+    database and its scratch space, which is not safe to use in concurrent
+    scans, so they share the lock as well.
+    """
+    database = hyperscan.Database()
+    database.compile(
+        expressions=[re.escape(keyword).encode() for keyword in keywords],
+        ids=list(range(len(keywords))),
+        elements=len(keywords),
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(keywords)
+    )
+    return database, threading.Lock()
+
+class _KeywordGroupCounter:
+    """Counts the distinct keywords of each group found in a lowercased text
+    
+    Uses Hyperscan when installed, then pyahocorasick, then the per-group
+    regex alternations (or plain substring tests).
+    """
+    def __init__(self, keyword_groups):
+        self.keyword_groups = keyword_groups
+        self.database = None
+        self.automaton = None
+        if hyperscan is not None:
+            try:
+                self.keywords = tuple(sorted({keyword for keywords in keyword_groups.values() for keyword in keywords}))
+                self.groups_by_id = [
+                    tuple(group for group, keywords in keyword_groups.items() if keyword in keywords)
+                    for keyword in self.keywords
+                ]
+                self.database, self.scan_lock = _compile_hyperscan(self.keywords)
+            except Exception as e:
+                logging.warning(f"Failed to compile Hyperscan database, using fallback: {e}")
+        if self.database is None:
+            self.automaton = _build_group_automaton(keyword_groups)
+            self.patterns = _build_group_patterns(keyword_groups)
+    
+    def count(self, text_lower):
+        """Return {group: distinct keyword count} for text_lower"""
+        counts = dict.fromkeys(self.keyword_groups, 0)
+        if self.database is not None:
+            hits = set()
+            with self.scan_lock:
+                self.database.scan(
+                    text_lower.encode('utf-8'),
+                    match_event_handler=lambda pattern_id, start, end, flags, context: hits.add(pattern_id)
+                )
+            for pattern_id in hits:
+                for group in self.groups_by_id[pattern_id]:
+                    counts[group] += 1
+        elif self.automaton is not None:
+            for keyword, groups in {payload for _, payload in self.automaton.iter(text_lower)}:
+                for group in groups:
+                    counts[group] += 1
+        else:
+            for group, keywords in self.keyword_groups.items():
+                pattern = self.patterns[group]
+                if pattern is None:
+                    counts[group] = sum(1 for keyword in keywords if keyword in text_lower)
+                else:
+                    counts[group] = len(set(pattern.findall(text_lower)))
+        return counts
+
+def _default_device():
+    """Use the first CUDA device when one is available, otherwise the CPU"""
+    if torch is not None and torch.cuda.is_available():
+        return 0
+    return -1
+
+def _load_onnx_model(model_name):
+    """Load the ONNX Runtime export of model_name, exporting it on first use"""
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    
+    export_dir = os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "--"))
+    if os.path.isdir(export_dir):
+        return ORTModelForSequenceClassification.from_pretrained(export_dir)
+    
+    model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+    model.save_pretrained(export_dir)
+    return model
+
+class _SentimentModel:
+    """Tokenizer + sequence classifier returning pipeline-style label scores
+    
+    The model runs in FP16 on a GPU; on the CPU its Linear layers are
+    dynamically quantized to INT8. With use_onnx=True it runs through
+    ONNX Runtime instead, falling back to PyTorch if that is unavailable.
+    """
+    def __init__(self, model_name, device, use_onnx=False):
+        if torch is None:
+            raise ImportError("torch is required for the sentiment model")
+        
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = None
+        if use_onnx:
+            try:
+                self.model = _load_onnx_model(model_name)
+                self.device = torch.device("cpu")
+                self.backend = "onnx"
+            except Exception as e:
+                logging.warning(f"ONNX sentiment model unavailable, using PyTorch: {e}")
+        
+        if self.model is None:
+            self.model = self._load_torch_model(model_name, device)
+        self.labels = [self.model.config.id2label[i] for i in range(self.model.config.num_labels)]
+    
+    def _load_torch_model(self, model_name, device):
+        """FP16 weights on a GPU, INT8 dynamically quantized Linear layers on the CPU"""
+        if device >= 0:
+            self.device = torch.device("cuda", device)
+            self.backend = "fp16"
+            model = AutoModelForSequenceClassification.from_pretrained(
+                model_name, torch_dtype=torch.float16
+            ).to(self.device)
+        else:
+            self.device = torch.device("cpu")
+            self.backend = "int8"
+            model = torch.ao.quantization.quantize_dynamic(
+                AutoModelForSequenceClassification.from_pretrained(model_name),
+                {torch.nn.Linear}, dtype=torch.qint8
             )
-        except Exception as e:
-            logging.error(f"Failed to load sentiment model: {e}")
-            self.sentiment_analyzer = None
+        return model.eval()
+    
+    def __call__(self, texts, batch_size=32, padding=True, truncation=True, max_length=512):
+        """Score each text; returns one [{label, score}, ...] list per text"""
+        outputs = []
+        with torch.inference_mode():
+            for start in range(0, len(texts), batch_size):
+                encoded = self.tokenizer(
+                    texts[start:start + batch_size], return_tensors="pt",
+                    padding=padding, truncation=truncation, max_length=max_length
+                ).to(self.device)
+                probabilities = torch.softmax(self.model(**encoded).logits.float(), dim=-1)
+                for row in probabilities.tolist():
+                    outputs.append([
+                        {"label": label, "score": score}
+                        for label, score in zip(self.labels, row)
+                    ])
+        return outputs
+
+class SentimentBiasAnalyzer:
+    def __init__(self, device=None, batch_size=32, use_onnx=None):
+        self.device = _default_device() if device is None else device
+        self.batch_size = batch_size
+        self.use_onnx = config.SENTIMENT_ONNX if use_onnx is None else use_onnx
+        
+        # The sentiment model is loaded on first use; see sentiment_analyzer
+        self._sentiment_analyzer = None
+        self._model_loaded = False
+        self._model_lock = threading.Lock()
         
         # Bias keywords for political detection
         self.political_bias_keywords = {
@@ -41,67 +245,162 @@ class SentimentBiasAnalyzer:
                 'positive', 'negative', 'good', 'bad', 'better', 'worse'
             ]
         }
+        
+        # Word lists for the rule-based sentiment fallback
+        self.fallback_sentiment_keywords = {
+            'positive': ['good', 'great', 'excellent', 'amazing', 'wonderful', 'positive', 'success', 'growth', 'improve'],
+            'negative': ['bad', 'terrible', 'awful', 'horrible', 'negative', 'failure', 'decline', 'crisis', 'problem']
+        }
+        
+        # One single-pass matcher per keyword set
+        self._political_counter = _KeywordGroupCounter(self.political_bias_keywords)
+        self._emotional_counter = _KeywordGroupCounter(self.emotional_bias_keywords)
+        self._fallback_counter = _KeywordGroupCounter(self.fallback_sentiment_keywords)
+    
+    @property
+    def sentiment_analyzer(self):
+        """The sentiment model, loaded on first access (None if it failed to load)"""
+        if not self._model_loaded:
+            with self._model_lock:
+                if not self._model_loaded:
+                    try:
+                        # Load sentiment analysis model
+                        self._sentiment_analyzer = _SentimentModel(
+                            config.SENTIMENT_MODEL, self.device, use_onnx=self.use_onnx
+                        )
+                    except Exception as e:
+                        logging.error(f"Failed to load sentiment model: {e}")
+                        self._sentiment_analyzer = None
+                    self._model_loaded = True
+        return self._sentiment_analyzer
     
     def analyze_sentiment(self, text):
         """Analyze sentiment of text"""
-        if not text or not text.strip():
-            return {"error": "Empty text provided"}
+        return self.analyze_sentiment_batch([text])[0]
+    
+    def analyze_many(self, texts):
+        """Analyze sentiment of many texts, batching them in buckets of similar length"""
+        return self.analyze_sentiment_batch(texts, bucketed=True)
+    
+    def analyze_sentiment_batch(self, texts, bucketed=False):
+        """Analyze sentiment of several texts with one batched model call"""
+        results = [None] * len(texts)
+        pending_indices = []
+        pending_texts = []
         
-        if not self.sentiment_analyzer:
-            return {"error": "Sentiment analyzer not available"}
-        
-        try:
-            # Truncate text to avoid model limitations
-            # Most sentiment models have token limits around 512 tokens
-            # Approximate: 1 token ≈ 4 characters for English
-            max_chars = 400  # Safe limit for most models
-            text_truncated = text[:max_chars] if len(text) > max_chars else text
-            
-            # Additional validation
-            if len(text_truncated.strip()) < 10:
-                return {"error": "Text too short for meaningful analysis"}
-            
-            results = self.sentiment_analyzer(text_truncated)
-            
-            # Process results
-            sentiment_scores = {}
-            for result in results[0]:
-                label = result['label'].lower()
-                score = result['score']
-                sentiment_scores[label] = round(score, 3)
-            
-            # Determine primary sentiment
-            primary_sentiment = max(sentiment_scores, key=sentiment_scores.get)
-            confidence = sentiment_scores[primary_sentiment]
-            
-            return {
-                "primary_sentiment": primary_sentiment,
-                "confidence": confidence,
-                "all_scores": sentiment_scores,
-                "text_length": len(text),
-                "analyzed_length": len(text_truncated),
-                "truncated": len(text) > max_chars
-            }
-            
-        except Exception as e:
-            logging.error(f"Error in sentiment analysis: {e}")
-            # Fallback to simple rule-based sentiment
-            return self._fallback_sentiment_analysis(text)
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                results[i] = {"error": "Empty text provided"}
+            elif not self.sentiment_analyzer:
+                results[i] = {"error": "Sentiment analyzer not available"}
+            else:
+                # Truncate text to avoid model limitations
+                text_truncated = text[:SENTIMENT_MAX_CHARS]
+                
+                # Additional validation
+                if len(text_truncated.strip()) < 10:
+                    results[i] = {"error": "Text too short for meaningful analysis"}
+                else:
+                    pending_indices.append(i)
+                    pending_texts.append(text_truncated)
+        
+        if not pending_texts:
+            return results
+        
+        # Scores depend on the truncated text and the backend (FP16, INT8 and ONNX
+        # differ slightly); reuse any stored on disk
+        model_id = f"sentiment:{config.SENTIMENT_MODEL}:{self.sentiment_analyzer.backend}"
+        keys = [cache_key(model_id, text) for text in pending_texts]
+        cached_scores = get_cached(keys)
+        uncached = [n for n, key in enumerate(keys) if key not in cached_scores]
+        
+        if uncached:
+            uncached_texts = [pending_texts[n] for n in uncached]
+            try:
+                if bucketed:
+                    outputs = self._run_length_buckets(uncached_texts)
+                else:
+                    outputs = self.sentiment_analyzer(
+                        uncached_texts, batch_size=self.batch_size, truncation=True, max_length=512
+                    )
+                # A missing output falls back below and is never cached
+                new_scores = {keys[n]: scores for n, scores in zip(uncached, outputs) if scores is not None}
+                set_cached(new_scores)
+                cached_scores.update(new_scores)
+            except Exception as e:
+                logging.error(f"Error in sentiment analysis: {e}")
+        
+        for i, text_truncated, key in zip(pending_indices, pending_texts, keys):
+            if key in cached_scores:
+                results[i] = self._build_sentiment_result(texts[i], text_truncated, cached_scores[key])
+            else:
+                # Fallback to simple rule-based sentiment
+                results[i] = self._fallback_sentiment_analysis(texts[i])
+        
+        return results
     
-    def detect_political_bias(self, text):
+    def _run_length_buckets(self, texts):
+        """Run the model on length-sorted buckets so batches carry little padding"""
+        tokenizer = self.sentiment_analyzer.tokenizer
+        lengths = np.array([len(tokenizer.encode(text, truncation=True, max_length=512)) for text in texts])
+        order = np.argsort(lengths, kind='stable')
+        sorted_lengths = lengths[order]
+        
+        outputs = [None] * len(texts)
+        start = 0
+        for bucket, (max_tokens, batch_size) in enumerate(SENTIMENT_BUCKETS):
+            # The last bucket takes whatever is left, whatever its length
+            if bucket == len(SENTIMENT_BUCKETS) - 1:
+                end = len(texts)
+            else:
+                end = int(np.searchsorted(sorted_lengths, max_tokens, side='right'))
+            indices = order[start:end].tolist()
+            if indices:
+                bucket_outputs = self.sentiment_analyzer(
+                    [texts[i] for i in indices],
+                    batch_size=batch_size, padding=True, truncation=True, max_length=512
+                )
+                # Scatter back to the original order
+                for i, scores in zip(indices, bucket_outputs):
+                    outputs[i] = scores
+            start = end
+        return outputs
+    
+    def _build_sentiment_result(self, text, text_truncated, scores):
+        """Turn the model's label scores for one text into the result dict"""
+        # Process results
+        sentiment_scores = {}
+        for result in scores:
+            label = result['label'].lower()
+            score = result['score']
+            sentiment_scores[label] = round(score, 3)
+        
+        # Determine primary sentiment
+        primary_sentiment = max(sentiment_scores, key=sentiment_scores.get)
+        confidence = sentiment_scores[primary_sentiment]
+        
+        return {
+            "primary_sentiment": primary_sentiment,
+            "confidence": confidence,
+            "all_scores": sentiment_scores,
+            "text_length": len(text),
+            "analyzed_length": len(text_truncated),
+            "truncated": len(text) > SENTIMENT_MAX_CHARS
+        }
+    
+    def detect_political_bias(self, text, text_lower=None):
         """Detect political bias in text"""
         if not text or not text.strip():
             return {"error": "Empty text provided"}
         
-        text_lower = text.lower()
+        if text_lower is None:
+            text_lower = text.lower()
         
         # Count keywords for each bias type
-        left_count = sum(1 for keyword in self.political_bias_keywords['left_leaning'] 
-                        if keyword in text_lower)
-        right_count = sum(1 for keyword in self.political_bias_keywords['right_leaning'] 
-                         if keyword in text_lower)
-        neutral_count = sum(1 for keyword in self.political_bias_keywords['neutral'] 
-                           if keyword in text_lower)
+        counts = self._political_counter.count(text_lower)
+        left_count = counts['left_leaning']
+        right_count = counts['right_leaning']
+        neutral_count = counts['neutral']
         
         # Calculate bias score
         total_political_keywords = left_count + right_count
@@ -129,20 +428,20 @@ class SentimentBiasAnalyzer:
             }
         }
     
-    def detect_emotional_bias(self, text):
+    def detect_emotional_bias(self, text, text_lower=None, word_count=None):
         """Detect emotional bias in text"""
         if not text or not text.strip():
             return {"error": "Empty text provided"}
         
-        text_lower = text.lower()
+        if text_lower is None:
+            text_lower = text.lower()
         
         # Count emotional keywords
-        highly_emotional_count = sum(1 for keyword in self.emotional_bias_keywords['highly_emotional'] 
-                                   if keyword in text_lower)
-        moderate_emotional_count = sum(1 for keyword in self.emotional_bias_keywords['moderate_emotional'] 
-                                     if keyword in text_lower)
+        counts = self._emotional_counter.count(text_lower)
+        highly_emotional_count = counts['highly_emotional']
+        moderate_emotional_count = counts['moderate_emotional']
         
-        total_words = len(text.split())
+        total_words = len(text.split()) if word_count is None else word_count
         
         # Calculate emotional bias
         if highly_emotional_count > 0:
@@ -164,15 +463,35 @@ class SentimentBiasAnalyzer:
             }
         }
     
-    def comprehensive_bias_analysis(self, text):
-        """Perform comprehensive bias analysis"""
+    def comprehensive_bias_analysis(self, text, text_lower=None):
+        """Perform comprehensive bias analysis (pass text_lower if already computed)"""
         if not text or not text.strip():
             return {"error": "Empty text provided"}
         
+        # Lowercase once for both keyword detectors
+        if text_lower is None:
+            text_lower = text.lower()
+        
         # Get all analysis results
         sentiment_result = self.analyze_sentiment(text)
-        political_bias_result = self.detect_political_bias(text)
-        emotional_bias_result = self.detect_emotional_bias(text)
+        return self._combine_bias_results(text, text_lower, sentiment_result)
+    
+    def comprehensive_bias_analysis_batch(self, texts):
+        """Run comprehensive_bias_analysis over several texts, batching the sentiment model"""
+        results = [{"error": "Empty text provided"} for _ in texts]
+        valid = [i for i, text in enumerate(texts) if text and text.strip()]
+        
+        sentiment_results = self.analyze_many([texts[i] for i in valid])
+        for i, sentiment_result in zip(valid, sentiment_results):
+            results[i] = self._combine_bias_results(texts[i], texts[i].lower(), sentiment_result)
+        return results
+    
+    def _combine_bias_results(self, text, text_lower, sentiment_result):
+        """Add the keyword-based detectors to a sentiment result"""
+        # Split once; the emotional detector and the summary share the count
+        word_count = len(text.split())
+        political_bias_result = self.detect_political_bias(text, text_lower)
+        emotional_bias_result = self.detect_emotional_bias(text, text_lower, word_count)
         
         # Combine results
         return {
@@ -180,17 +499,15 @@ class SentimentBiasAnalyzer:
             "political_bias": political_bias_result,
             "emotional_bias": emotional_bias_result,
             "text_length": len(text),
-            "word_count": len(text.split())
+            "word_count": word_count
         }
 
     def _fallback_sentiment_analysis(self, text):
         """Simple rule-based sentiment analysis as fallback"""
-        positive_words = ['good', 'great', 'excellent', 'amazing', 'wonderful', 'positive', 'success', 'growth', 'improve']
-        negative_words = ['bad', 'terrible', 'awful', 'horrible', 'negative', 'failure', 'decline', 'crisis', 'problem']
-        
         text_lower = text.lower()
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        negative_count = sum(1 for word in negative_words if word in text_lower)
+        counts = self._fallback_counter.count(text_lower)
+        positive_count = counts['positive']
+        negative_count = counts['negative']
         
         if positive_count > negative_count:
             return {
@@ -214,4 +531,7 @@ class SentimentBiasAnalyzer:
                 "method": "fallback_rule_based"
             }
 
-sentiment_bias_analyzer = SentimentBiasAnalyzer()
\ No newline at end of file
+@functools.lru_cache(maxsize=None)
+def get_sentiment_bias_analyzer():
+    """Return the shared SentimentBiasAnalyzer, creating it on first call"""
+    return SentimentBiasAnalyzer()
\ No newline at end of file
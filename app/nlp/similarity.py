@@ -1,16 +1,79 @@
 from sentence_transformers import SentenceTransformer
+from collections import OrderedDict
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+import contextlib
+import hashlib
+import functools
 import logging
+import threading
+from utils.nlp_cache import cache_key, get_cached, set_cached
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+# Most recently used embeddings kept by _encode_normalized
+EMBEDDING_CACHE_SIZE = 4096
+
+SIMILARITY_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+class CorpusIndex:
+    """Texts encoded once by index_corpus, searchable by find_similar_sentences"""
+    __slots__ = ('texts', 'embeddings', 'faiss_index')
+    
+    def __init__(self, texts, embeddings):
+        self.texts = texts
+        self.embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self.faiss_index = None
+        if faiss is not None:
+            # Inner product on unit vectors is cosine similarity
+            self.faiss_index = faiss.IndexFlatIP(self.embeddings.shape[1])
+            self.faiss_index.add(self.embeddings)
 
 class TextSimilarityAnalyzer:
     def __init__(self):
-        try:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-            logging.info("Sentence transformer model loaded successfully")
-        except Exception as e:
-            logging.error(f"Failed to load sentence transformer: {e}")
-            self.model = None
+        # The encoder is loaded on first use; see model
+        self._model = None
+        self._model_precision = None
+        self._model_loaded = False
+        self._model_lock = threading.Lock()
+        
+        # Unit-length embeddings keyed by a hash of the text
+        self._emb_cache = OrderedDict()
+        self._emb_lock = threading.Lock()
+    
+    @property
+    def model(self):
+        """The sentence encoder, loaded on first access (None if it failed to load)"""
+        if not self._model_loaded:
+            with self._model_lock:
+                if not self._model_loaded:
+                    try:
+                        if torch is not None and torch.cuda.is_available():
+                            # Half precision on the GPU halves weight traffic and uses tensor cores
+                            self._model = SentenceTransformer(SIMILARITY_MODEL_NAME, device='cuda').half()
+                            self._model_precision = 'fp16'
+                        else:
+                            self._model = SentenceTransformer(SIMILARITY_MODEL_NAME)
+                            self._model_precision = 'fp32'
+                        logging.info("Sentence transformer model loaded successfully")
+                    except Exception as e:
+                        logging.error(f"Failed to load sentence transformer: {e}")
+                        self._model = None
+                    self._model_loaded = True
+        return self._model
+    
+    def _inference_mode(self):
+        """Disable autograd bookkeeping around encode calls"""
+        if torch is None:
+            return contextlib.nullcontext()
+        return torch.inference_mode()
     
     def get_embeddings(self, texts):
         """Get embeddings for list of texts"""
@@ -21,45 +84,128 @@ class TextSimilarityAnalyzer:
             if isinstance(texts, str):
                 texts = [texts]
             
-            embeddings = self.model.encode(texts)
-            return embeddings
+            with self._inference_mode():
+                embeddings = self.model.encode(texts)
+            return embeddings.astype(np.float32, copy=False)
         except Exception as e:
             logging.error(f"Error getting embeddings: {e}")
             return None
     
+    def _encode_normalized(self, texts):
+        """Get unit-length embeddings for texts, encoding only those not cached yet"""
+        if not self.model:
+            return None
+        
+        keys = [hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest() for text in texts]
+        with self._emb_lock:
+            embeddings = [self._emb_cache.get(key) for key in keys]
+            for key, embedding in zip(keys, embeddings):
+                if embedding is not None:
+                    self._emb_cache.move_to_end(key)
+        
+        # Then the on-disk cache, and one batched encode for every distinct text still missing
+        missing = {key: text for key, text, embedding in zip(keys, texts, embeddings) if embedding is None}
+        new_embeddings = {}
+        if missing:
+            model_id = f"embedding:{SIMILARITY_MODEL_NAME}:{self._model_precision}"
+            disk_keys = {key: cache_key(model_id, text) for key, text in missing.items()}
+            stored = get_cached(disk_keys.values())
+            for key in list(missing):
+                if disk_keys[key] in stored:
+                    new_embeddings[key] = stored[disk_keys[key]]
+                    del missing[key]
+        
+        if missing:
+            try:
+                with self._inference_mode():
+                    encoded = self.model.encode(
+                        list(missing.values()), batch_size=32,
+                        convert_to_numpy=True, normalize_embeddings=True
+                    )
+                # FP16 models return float16 arrays; keep the NumPy maths in float32
+                encoded = encoded.astype(np.float32, copy=False)
+            except Exception as e:
+                logging.error(f"Error getting embeddings: {e}")
+                return None
+            
+            encoded_embeddings = dict(zip(missing, encoded))
+            set_cached({disk_keys[key]: embedding for key, embedding in encoded_embeddings.items()})
+            new_embeddings.update(encoded_embeddings)
+        
+        if new_embeddings:
+            with self._emb_lock:
+                self._emb_cache.update(new_embeddings)
+                while len(self._emb_cache) > EMBEDDING_CACHE_SIZE:
+                    self._emb_cache.popitem(last=False)
+            embeddings = [new_embeddings[key] if embedding is None else embedding
+                          for key, embedding in zip(keys, embeddings)]
+        
+        return np.vstack(embeddings)
+    
     def calculate_similarity(self, text1, text2):
         """Calculate similarity between two texts"""
         if not text1 or not text2:
             return 0.0
         
-        embeddings = self.get_embeddings([text1, text2])
+        embeddings = self._encode_normalized([text1, text2])
         if embeddings is None or len(embeddings) < 2:
             return 0.0
         
-        similarity = cosine_similarity([embeddings[0]], [embeddings[1]])[0][0]
+        # Embeddings are unit length, so the dot product is the cosine similarity
+        similarity = embeddings[0] @ embeddings[1]
         return round(float(similarity), 3)
     
+    def index_corpus(self, texts):
+        """Encode texts once; pass the returned CorpusIndex to find_similar_sentences
+        
+        The index is returned rather than stored because the analyzer is shared
+        by every Streamlit session. Returns None if encoding fails.
+        """
+        texts = list(texts or [])
+        embeddings = self._encode_normalized(texts) if texts else None
+        if embeddings is None:
+            return None
+        return CorpusIndex(texts, embeddings)
+    
     def find_similar_sentences(self, target_text, source_texts, threshold=0.5):
-        """Find similar sentences from source texts"""
+        """Find similar sentences from source texts (a list or a CorpusIndex from index_corpus)"""
+        if isinstance(source_texts, CorpusIndex):
+            source_embeddings = source_texts.embeddings
+            index = source_texts.faiss_index
+            source_texts = source_texts.texts
+        else:
+            source_embeddings = None
+            index = None
+        
         if not target_text or not source_texts:
             return []
         
         # Get embeddings for target and all source texts
-        all_texts = [target_text] + source_texts
-        embeddings = self.get_embeddings(all_texts)
-        
-        if embeddings is None:
-            return []
+        if source_embeddings is None:
+            embeddings = self._encode_normalized([target_text] + source_texts)
+            if embeddings is None:
+                return []
+            target_embedding = embeddings[:1]
+            source_embeddings = embeddings[1:]
+        else:
+            target_embedding = self._encode_normalized([target_text])
+            if target_embedding is None:
+                return []
         
-        target_embedding = embeddings[0]
-        source_embeddings = embeddings[1:]
-        
-        # Calculate similarities
-        similarities = cosine_similarity([target_embedding], source_embeddings)[0]
+        # Calculate similarities above the threshold
+        target_embedding = np.ascontiguousarray(target_embedding, dtype=np.float32)
+        if index is not None:
+            # Search just under the threshold, then apply it exactly below
+            _, distances, ids = index.range_search(target_embedding, threshold - 1e-6)
+            candidates = zip(ids.tolist(), distances.tolist())
+        else:
+            similarities = source_embeddings @ target_embedding[0]
+            hits = np.flatnonzero(similarities >= threshold)
+            candidates = zip(hits.tolist(), similarities[hits].tolist())
         
         # Find texts above threshold
         similar_texts = []
-        for i, similarity in enumerate(similarities):
+        for i, similarity in sorted(candidates):
             if similarity >= threshold:
                 similar_texts.append({
                     "text": source_texts[i],
@@ -81,18 +227,25 @@ class TextSimilarityAnalyzer:
         
         # Split into sentences and find most similar ones
         from utils.text_cleaner import text_cleaner
-        sentences1 = text_cleaner.tokenize_sentences(article1)
-        sentences2 = text_cleaner.tokenize_sentences(article2)
+        # Only the leading sentences are compared, so the regex splitter is enough here
+        sentences1 = text_cleaner.tokenize_sentences(article1, use_nltk=False)
+        sentences2 = text_cleaner.tokenize_sentences(article2, use_nltk=False)
         
         # Find similar sentence pairs
         similar_pairs = []
-        for i, sent1 in enumerate(sentences1[:10]):  # Limit to first 10 sentences
-            for j, sent2 in enumerate(sentences2[:10]):
-                similarity = self.calculate_similarity(sent1, sent2)
+        head1 = sentences1[:10]  # Limit to first 10 sentences
+        head2 = sentences2[:10]
+        embeddings = self._encode_normalized(head1 + head2) if head1 and head2 else None
+        if embeddings is not None:
+            # Cosine similarity of every pair in one matmul; the threshold still
+            # applies to the rounded score, so prefilter just below it
+            similarity_matrix = embeddings[:len(head1)] @ embeddings[len(head1):].T
+            for i, j in np.argwhere(similarity_matrix > 0.5995).tolist():
+                similarity = round(float(similarity_matrix[i, j]), 3)
                 if similarity > 0.6:  # High similarity threshold
                     similar_pairs.append({
-                        "sentence1": sent1,
-                        "sentence2": sent2,
+                        "sentence1": head1[i],
+                        "sentence2": head2[j],
                         "similarity": similarity,
                         "indices": [i, j]
                     })
@@ -111,15 +264,22 @@ class TextSimilarityAnalyzer:
         if not articles or len(articles) < 2:
             return {"error": "At least 2 articles required"}
         
+        # Encode every article once and get all pairwise similarities from one matmul;
+        # pairs involving an empty article (or a failed encode) score 0.0 as before
+        present = [i for i, article in enumerate(articles) if article]
+        similarity_matrix = np.zeros((len(articles), len(articles)))
+        embeddings = self._encode_normalized([articles[i] for i in present]) if present else None
+        if embeddings is not None:
+            similarity_matrix[np.ix_(present, present)] = embeddings @ embeddings.T
+        
         # Calculate pairwise similarities
         similarities = []
-        for i in range(len(articles)):
-            for j in range(i + 1, len(articles)):
-                similarity = self.calculate_similarity(articles[i], articles[j])
-                similarities.append({
-                    "article_pair": [i, j],
-                    "similarity": similarity
-                })
+        rows, cols = np.triu_indices(len(articles), 1)
+        for i, j, similarity in zip(rows.tolist(), cols.tolist(), similarity_matrix[rows, cols].tolist()):
+            similarities.append({
+                "article_pair": [i, j],
+                "similarity": round(similarity, 3)
+            })
         
         # Sort by similarity
         similarities.sort(key=lambda x: x["similarity"], reverse=True)
@@ -134,4 +294,7 @@ class TextSimilarityAnalyzer:
             "total_comparisons": len(similarities)
         }
 
-similarity_analyzer = TextSimilarityAnalyzer()
\ No newline at end of file
+@functools.lru_cache(maxsize=None)
+def get_similarity_analyzer():
+    """Return the shared TextSimilarityAnalyzer, creating it on first call"""
+    return TextSimilarityAnalyzer()
\ No newline at end of file
@@ -1,16 +1,36 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from newspaper import Article
+from newspaper import network
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
 import logging
 from config import config
-from utils.helpers import is_valid_url, extract_domain
+from utils.helpers import is_valid_url, extract_domain, registered_domain
+
+_SOCIAL_MEDIA_DOMAINS = frozenset(['twitter.com', 'x.com', 'facebook.com', 'instagram.com', 'linkedin.com'])
+
+# <article>/<div> elements whose class mentions one of the keywords (case-insensitive)
+_ARTICLE_SELECTOR = ', '.join(
+    f'{tag}[class*={keyword} i]'
+    for tag in ('article', 'div')
+    for keyword in ('content', 'article', 'story', 'post')
+)
 
 class ContentExtractor:
+    MAX_CONCURRENT_DOWNLOADS = 16
+    MAX_FALLBACK_BYTES = 2 * 1024 * 1024  # enough for any article; caps pathological pages
+
     def __init__(self):
         self.timeout = config.TIMEOUT
         self.user_agent = config.USER_AGENT
         self.session = requests.Session()
         self.session.headers.update({'User-Agent': self.user_agent})
+        # Keep-alive pool shared by the newspaper3k downloads and the fallback path
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=Retry(total=2))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
     
     def extract_from_url(self, url):
         """Extract content from URL using newspaper3k"""
@@ -22,9 +42,12 @@ class ContentExtractor:
             return self._handle_social_media_url(url)
         
         try:
-            # Use newspaper3k for article extraction
+            # Use newspaper3k for article extraction; fetch through the pooled
+            # session and hand the response to newspaper for decoding
             article = Article(url)
-            article.download()
+            response = self.session.get(url, timeout=article.config.request_timeout)
+            response.raise_for_status()
+            article.download(input_html=network.get_html_2XX_only(url, article.config, response=response))
             article.parse()
             
             # Extract basic information
@@ -45,11 +68,17 @@ class ContentExtractor:
             logging.error(f"Error extracting content from {url}: {e}")
             return self.fallback_extraction(url)
     
+    def extract_many(self, urls):
+        """Extract several URLs concurrently; results keep the order of urls"""
+        if not urls:
+            return []
+        
+        with ThreadPoolExecutor(max_workers=min(self.MAX_CONCURRENT_DOWNLOADS, len(urls))) as executor:
+            return list(executor.map(self.extract_from_url, urls))
+    
     def _is_social_media_url(self, url):
         """Check if URL is from social media platform"""
-        social_domains = ['twitter.com', 'x.com', 'facebook.com', 'instagram.com', 'linkedin.com']
-        domain = extract_domain(url).lower()
-        return any(social_domain in domain for social_domain in social_domains)
+        return registered_domain(extract_domain(url)) in _SOCIAL_MEDIA_DOMAINS
     
     def _handle_social_media_url(self, url):
         """Handle social media URLs with appropriate message"""
@@ -65,13 +94,22 @@ class ContentExtractor:
     def fallback_extraction(self, url):
         """Fallback method using BeautifulSoup"""
         try:
-            response = self.session.get(url, timeout=self.timeout)
-            response.raise_for_status()
+            # Stream the body and stop reading at MAX_FALLBACK_BYTES
+            with self.session.get(url, timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+                chunks = []
+                size = 0
+                for chunk in response.iter_content(chunk_size=65536):
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= self.MAX_FALLBACK_BYTES:
+                        break
+            html = b''.join(chunks)[:self.MAX_FALLBACK_BYTES]
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = BeautifulSoup(html, 'lxml')
             
             # Remove script and style elements
-            for script in soup(["script", "style"]):
+            for script in soup.select('script, style'):
                 script.decompose()
             
             # Extract title
@@ -81,12 +119,10 @@ class ContentExtractor:
             
             # Extract content from common article tags
             content = ""
-            article_tags = soup.find_all(['article', 'div'], class_=lambda x: x and any(
-                keyword in x.lower() for keyword in ['content', 'article', 'story', 'post']
-            ))
+            article_tag = soup.select_one(_ARTICLE_SELECTOR)
             
-            if article_tags:
-                content = article_tags[0].get_text(strip=True)
+            if article_tag is not None:
+                content = article_tag.get_text(strip=True)
             else:
                 # Fallback to body text
                 content = soup.get_text(strip=True)
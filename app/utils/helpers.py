@@ -1,5 +1,7 @@
 import re
+import functools
 import logging
+import numpy as np
 from datetime import datetime
 from urllib.parse import urlparse
 
@@ -11,6 +13,21 @@ def is_valid_url(url):
     except:
         return False
 
+_NEWS_DOMAINS = frozenset([
+    'bbc.com', 'cnn.com', 'reuters.com', 'ap.org', 'npr.org',
+    'theguardian.com', 'nytimes.com', 'washingtonpost.com',
+    'timesofindia.com', 'hindustantimes.com', 'indianexpress.com'
+])
+
+_SOCIAL_DOMAINS = frozenset([
+    'twitter.com', 'facebook.com', 'instagram.com', 'linkedin.com'
+])
+
+_BLOG_DOMAINS = frozenset([
+    'medium.com', 'wordpress.com', 'blogspot.com'
+])
+
+@functools.lru_cache(maxsize=4096)
 def extract_domain(url):
     """Extract domain from URL"""
     try:
@@ -19,29 +36,21 @@ def extract_domain(url):
     except:
         return ""
 
+def registered_domain(domain):
+    """Reduce a host to its last two labels, e.g. 'edition.cnn.com:443' -> 'cnn.com'"""
+    host = domain.lower().rsplit('@', 1)[-1].split(':', 1)[0]
+    return '.'.join(host.split('.')[-2:])
+
+@functools.lru_cache(maxsize=4096)
 def classify_source_type(url):
     """Classify source type based on URL"""
-    domain = extract_domain(url).lower()
-    
-    news_domains = [
-        'bbc.com', 'cnn.com', 'reuters.com', 'ap.org', 'npr.org',
-        'theguardian.com', 'nytimes.com', 'washingtonpost.com',
-        'timesofindia.com', 'hindustantimes.com', 'indianexpress.com'
-    ]
+    domain = registered_domain(extract_domain(url))
     
-    social_domains = [
-        'twitter.com', 'facebook.com', 'instagram.com', 'linkedin.com'
-    ]
-    
-    blog_domains = [
-        'medium.com', 'wordpress.com', 'blogspot.com'
-    ]
-    
-    if any(news_domain in domain for news_domain in news_domains):
+    if domain in _NEWS_DOMAINS:
         return "news"
-    elif any(social_domain in domain for social_domain in social_domains):
+    elif domain in _SOCIAL_DOMAINS:
         return "social"
-    elif any(blog_domain in domain for blog_domain in blog_domains):
+    elif domain in _BLOG_DOMAINS:
         return "blog"
     else:
         return "other"
@@ -58,10 +67,21 @@ def calculate_confidence_score(scores):
         return 0.0
     
     # Simple average of all confidence scores
-    total = sum(score for score in scores.values() if isinstance(score, (int, float)))
-    count = len([score for score in scores.values() if isinstance(score, (int, float))])
+    values = [score for score in scores.values() if isinstance(score, (int, float))]
+    
+    return round(sum(values) / len(values), 2) if values else 0.0
+
+def calculate_confidence_scores_batch(score_dicts):
+    """Calculate calculate_confidence_score for many score dicts, as a NumPy array"""
+    values = [[score for score in scores.values() if isinstance(score, (int, float))] if scores else []
+              for scores in score_dicts]
+    counts = np.fromiter(map(len, values), dtype=np.float64, count=len(values))
+    totals = np.fromiter(map(sum, values), dtype=np.float64, count=len(values))
     
-    return round(total / count, 2) if count > 0 else 0.0
+    # Dicts without numeric scores get 0.0, like the single-dict version
+    means = np.divide(totals, counts, out=np.zeros(len(values)), where=counts > 0)
+    # ndarray.round scales by 100 first and can differ from round(x, 2); round each mean in Python
+    return np.array([round(mean, 2) for mean in means.tolist()])
 
 def truncate_text(text, max_length=100):
     """Truncate text to specified length"""
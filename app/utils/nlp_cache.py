@@ -0,0 +1,60 @@
+import functools
+import hashlib
+import logging
+import os
+from config import config
+
+try:
+    from diskcache import Cache
+except ImportError:
+    Cache = None
+
+# Model outputs (sentiment scores, embeddings) survive Streamlit reruns and restarts here.
+# Values are pickled, so the directory must not be writable by other users.
+NLP_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "sourceshield", "nlp")
+NLP_CACHE_SIZE_LIMIT = 512 * 1024 * 1024  # bytes; diskcache evicts least recently stored entries
+
+def cache_key(model_id, text):
+    """Key for a model output: model identifier plus a hash of the exact model input"""
+    return f"{model_id}:{hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()}"
+
+@functools.lru_cache(maxsize=None)
+def get_nlp_cache():
+    """Return the shared on-disk cache, or None when disabled or diskcache is unavailable"""
+    if not config.NLP_DISK_CACHE or Cache is None:
+        return None
+    try:
+        os.makedirs(NLP_CACHE_DIR, mode=0o700, exist_ok=True)
+        return Cache(NLP_CACHE_DIR, size_limit=NLP_CACHE_SIZE_LIMIT)
+    except Exception as e:
+        logging.warning(f"Failed to open NLP cache at {NLP_CACHE_DIR}: {e}")
+        return None
+
+def get_cached(keys):
+    """Look up several keys; returns {key: value} for the ones found"""
+    cache = get_nlp_cache()
+    if cache is None:
+        return {}
+    
+    found = {}
+    try:
+        for key in keys:
+            value = cache.get(key)
+            if value is not None:
+                found[key] = value
+    except Exception as e:
+        logging.warning(f"NLP cache lookup failed: {e}")
+    return found
+
+def set_cached(items):
+    """Store {key: value} pairs in one transaction"""
+    cache = get_nlp_cache()
+    if cache is None or not items:
+        return
+    
+    try:
+        with cache.transact():
+            for key, value in items.items():
+                cache.set(key, value)
+    except Exception as e:
+        logging.warning(f"NLP cache write failed: {e}")
@@ -1,10 +1,17 @@
 import re
+import bisect
+import functools
 import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize, sent_tokenize
 from nltk.stem import WordNetLemmatizer
 import string
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 # Download required NLTK data
 try:
     nltk.data.find('tokenizers/punkt')
@@ -21,10 +28,31 @@ try:
 except LookupError:
     nltk.download('wordnet')
 
+# Every token the old `token not in string.punctuation` substring test dropped
+PUNCTUATION_TOKENS = frozenset(
+    string.punctuation[i:j]
+    for i in range(len(string.punctuation))
+    for j in range(i + 1, len(string.punctuation) + 1)
+)
+
 class TextCleaner:
-    def __init__(self):
-        self.stop_words = set(stopwords.words('english'))
+    # Patterns used by clean_text, compiled once
+    _WHITESPACE_RE = re.compile(r'\s+')
+    _URL_RE = re.compile(r'http\S+|www\S+')
+    _SPECIAL_CHARS_RE = re.compile(r'[^\w\s.,!?;:-]')
+    _MULTI_PUNCT_RE = re.compile(r'[.,!?;:-]{2,}')
+    
+    # Fast sentence boundary: terminal punctuation, whitespace, then a capital
+    _SENTENCE_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z])')
+    
+    def __init__(self, use_nltk=True):
+        # Punkt handles abbreviations ("U.S.", "Dr.") that the regex splitter breaks on
+        self.use_nltk = use_nltk
+        self.stop_words = frozenset(stopwords.words('english'))
+        self._dropped_tokens = PUNCTUATION_TOKENS | self.stop_words
         self.lemmatizer = WordNetLemmatizer()
+        # WordNet lookups repeat heavily across articles; memoize them per word
+        self._lemmatize = functools.lru_cache(maxsize=100000)(self.lemmatizer.lemmatize)
     
     def clean_text(self, text):
         """Basic text cleaning"""
@@ -32,22 +60,26 @@ class TextCleaner:
             return ""
         
         # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = self._WHITESPACE_RE.sub(' ', text)
         
         # Remove URLs
-        text = re.sub(r'http\S+|www\S+', '', text)
+        text = self._URL_RE.sub('', text)
         
         # Remove special characters but keep basic punctuation
-        text = re.sub(r'[^\w\s.,!?;:-]', '', text)
+        text = self._SPECIAL_CHARS_RE.sub('', text)
         
         # Remove multiple punctuation
-        text = re.sub(r'[.,!?;:-]{2,}', '.', text)
+        text = self._MULTI_PUNCT_RE.sub('.', text)
         
         return text.strip()
     
-    def tokenize_sentences(self, text):
-        """Split text into sentences"""
-        return sent_tokenize(text)
+    def tokenize_sentences(self, text, use_nltk=None):
+        """Split text into sentences (use_nltk=False selects the faster regex splitter)"""
+        if use_nltk is None:
+            use_nltk = self.use_nltk
+        if use_nltk:
+            return sent_tokenize(text)
+        return [sentence for sentence in self._SENTENCE_RE.split(text.strip()) if sentence]
     
     def tokenize_words(self, text):
         """Tokenize text into words"""
@@ -59,7 +91,7 @@ class TextCleaner:
     
     def lemmatize_tokens(self, tokens):
         """Lemmatize tokens"""
-        return [self.lemmatizer.lemmatize(token) for token in tokens]
+        return [self._lemmatize(token) for token in tokens]
     
     def preprocess_text(self, text, remove_stopwords=True, lemmatize=True):
         """Complete preprocessing pipeline"""
@@ -69,29 +101,47 @@ class TextCleaner:
         # Tokenize
         tokens = self.tokenize_words(cleaned_text)
         
-        # Remove punctuation
-        tokens = [token for token in tokens if token not in string.punctuation]
-        
-        # Remove stopwords
-        if remove_stopwords:
-            tokens = self.remove_stopwords(tokens)
-        
-        # Lemmatize
+        # Remove punctuation and stopwords, then lemmatize, in a single pass
+        dropped = self._dropped_tokens if remove_stopwords else PUNCTUATION_TOKENS
         if lemmatize:
-            tokens = self.lemmatize_tokens(tokens)
-        
-        return tokens
+            return [self._lemmatize(token) for token in tokens if token not in dropped]
+        return [token for token in tokens if token not in dropped]
     
     def extract_sentences_with_keywords(self, text, keywords):
         """Extract sentences containing specific keywords"""
         sentences = self.tokenize_sentences(text)
-        relevant_sentences = []
+        keywords_lower = {keyword.lower() for keyword in keywords}
+        
+        # An empty keyword is a substring of every sentence
+        if '' in keywords_lower:
+            return sentences
+        if not keywords_lower:
+            return []
+        
+        sentences_lower = [sentence.lower() for sentence in sentences]
+        if ahocorasick is None:
+            return [sentence for sentence, sentence_lower in zip(sentences, sentences_lower)
+                    if any(keyword in sentence_lower for keyword in keywords_lower)]
+        
+        automaton = ahocorasick.Automaton()
+        for keyword in keywords_lower:
+            automaton.add_word(keyword, keyword)
+        automaton.make_automaton()
+        
+        # Scan every sentence in one pass over their NUL-joined concatenation
+        sentence_starts = []
+        position = 0
+        for sentence_lower in sentences_lower:
+            sentence_starts.append(position)
+            position += len(sentence_lower) + 1
         
-        for sentence in sentences:
-            sentence_lower = sentence.lower()
-            if any(keyword.lower() in sentence_lower for keyword in keywords):
-                relevant_sentences.append(sentence)
+        # A match counts for the sentence whose span contains all of it
+        matched = set()
+        for end, keyword in automaton.iter('\x00'.join(sentences_lower)):
+            index = bisect.bisect_right(sentence_starts, end - len(keyword) + 1) - 1
+            if end < sentence_starts[index] + len(sentences_lower[index]):
+                matched.add(index)
         
-        return relevant_sentences
+        return [sentences[index] for index in sorted(matched)]
 
 text_cleaner = TextCleaner()
\ No newline at end of file